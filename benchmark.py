@@ -0,0 +1,420 @@
+import argparse
+import csv
+import json
+import math
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+from utils.sharding import without_shard_env
+
+try:
+    import resource  # POSIX only, used to measure load generator CPU
+except ImportError:
+    resource = None
+
+BENCHMARK_PROFILES = {
+    "smoke": {
+        "users": 5,
+        "spawn_rate": 5,
+        "run_time": 30,  # seconds
+        "user_classes": ["SlumberlandStrategy", "NeverwinterStrategy"],
+    },
+    "baseline": {
+        "users": 30,
+        "spawn_rate": 10,
+        "run_time": 120,
+        "user_classes": ["SlumberlandStrategy", "NeverwinterStrategy"],
+    },
+    "slumberland": {
+        "users": 20,
+        "spawn_rate": 10,
+        "run_time": 120,
+        "user_classes": ["SlumberlandStrategy"],
+    },
+    "neverwinter": {
+        "users": 20,
+        "spawn_rate": 10,
+        "run_time": 120,
+        "user_classes": ["NeverwinterStrategy"],
+    },
+}
+
+# Metric name -> direction in which a change counts as a regression
+METRIC_DIRECTIONS = {
+    "rps": "lower",
+    "failure_ratio": "higher",
+    "cpu_percent": "higher",
+    "p50": "higher",
+    "p95": "higher",
+    "p99": "higher",
+}
+
+PERCENTILE_COLUMNS = {"p50": "50%", "p95": "95%", "p99": "99%"}
+
+
+def port_in_use(port):
+    """True when something already accepts connections on the local port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1)
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+def start_mock_backend(port=5000, log_file=None, timeout=30):
+    """Start mock_backend.py in its own process group and wait until /health answers."""
+    # A leftover backend on the port would answer /health and get measured instead of ours
+    if port_in_use(port):
+        raise RuntimeError(f"Port {port} is already in use, stop the process listening on it or pick --port")
+    env = dict(os.environ, PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "mock_backend.py"],
+        env=env,
+        stdout=log_file or subprocess.DEVNULL,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,  # debug reloader forks a child, kill the whole group on stop
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Mock backend exited early with code {process.returncode}")
+        try:
+            req = urllib.request.Request(f"http://127.0.0.1:{port}/health", data=b"", method="POST")
+            with urllib.request.urlopen(req, timeout=1) as resp:
+                if resp.status == 200:
+                    if process.poll() is not None:
+                        raise RuntimeError(f"Mock backend exited with code {process.returncode}, "
+                                           f"/health was answered by another process")
+                    print(f"[benchmark] Mock backend ready on port {port}")
+                    return process
+        except OSError:
+            time.sleep(0.5)
+    stop_mock_backend(process)
+    raise TimeoutError(f"Mock backend did not become healthy within {timeout}s")
+
+
+def stop_mock_backend(process):
+    """Terminate the mock backend process group."""
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (AttributeError, ProcessLookupError):
+        process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def children_cpu_seconds():
+    """Total user+system CPU time of reaped child processes, None if unavailable."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def build_locust_command(profile, host, csv_prefix, users=None):
+    """Build the headless locust command line for a profile."""
+    return [
+        sys.executable, "-m", "locust",
+        "-f", "locustfile.py",
+        "--headless",
+        "--only-summary",
+        "-u", str(users if users is not None else profile["users"]),
+        "-r", str(profile["spawn_rate"]),
+        "-t", f"{profile['run_time']}s",
+        "--host", host,
+        "--csv", csv_prefix,
+        *profile["user_classes"],
+    ]
+
+
+def parse_stats_csv(stats_file):
+    """
+    Parse a locust *_stats.csv file.
+    :param stats_file: path to the csv written by ``--csv``
+    :return: dict with aggregated totals and per-operation percentiles
+    """
+    operations = {}
+    aggregated = None
+    with open(stats_file, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            entry = {
+                "requests": int(row["Request Count"]),
+                "failures": int(row["Failure Count"]),
+                "rps": float(row["Requests/s"]),
+            }
+            for key, column in PERCENTILE_COLUMNS.items():
+                value = row.get(column, "N/A")
+                entry[key] = None if value in ("", "N/A") else float(value)
+            if row["Name"] == "Aggregated":
+                aggregated = entry
+            else:
+                operations[row["Name"]] = entry
+
+    if aggregated is None:
+        raise ValueError(f"No aggregated row found in {stats_file}")
+    return {"aggregated": aggregated, "operations": operations}
+
+
+def run_locust(profile, host, workdir, label="run", users=None, env=None, log_file=None):
+    """Start one headless locust process for a profile without waiting for it."""
+    csv_prefix = os.path.join(workdir, label)
+    process = subprocess.Popen(
+        build_locust_command(profile, host, csv_prefix, users),
+        env=env,
+        stdout=log_file or subprocess.DEVNULL,
+        stderr=subprocess.STDOUT,
+    )
+    return process, f"{csv_prefix}_stats.csv"
+
+
+def run_profile_once(profile, host, workdir, label, log_file=None):
+    """Run a profile once and return its parsed stats plus generator CPU usage."""
+    cpu_before = children_cpu_seconds()
+    started = time.time()
+    # A TENANT_SHARD/POOL_SHARD left in the shell would disable strategies or shrink the user pools
+    process, stats_file = run_locust(profile, host, workdir, label, env=without_shard_env(), log_file=log_file)
+    process.wait()
+    wall = time.time() - started
+    cpu_after = children_cpu_seconds()
+
+    # locust exits non-zero whenever a request failed, the stats file tells us if the run happened
+    if not os.path.exists(stats_file):
+        raise RuntimeError(f"Locust run '{label}' produced no stats (exit code {process.returncode})")
+
+    stats = parse_stats_csv(stats_file)
+    stats["cpu_percent"] = None if cpu_before is None else 100.0 * (cpu_after - cpu_before) / wall
+    return stats
+
+
+def summarize(values):
+    """Reduce repeated measurements to mean/stdev/n, ignoring missing samples."""
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "mean": round(statistics.mean(values), 3),
+        "stdev": round(statistics.stdev(values), 3) if len(values) > 1 else 0.0,
+        "n": len(values),
+    }
+
+
+def build_result(profile_name, profile, runs):
+    """Fold the per-run stats into the compact result document."""
+    result = {
+        "profile": profile_name,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "settings": profile,
+        "runs": len(runs),
+        "requests": sum(r["aggregated"]["requests"] for r in runs),
+        "failures": sum(r["aggregated"]["failures"] for r in runs),
+        "rps": summarize([r["aggregated"]["rps"] for r in runs]),
+        "failure_ratio": summarize([
+            r["aggregated"]["failures"] / r["aggregated"]["requests"] if r["aggregated"]["requests"] else None
+            for r in runs
+        ]),
+        "cpu_percent": summarize([r["cpu_percent"] for r in runs]),
+        "operations": {},
+    }
+
+    names = sorted({name for r in runs for name in r["operations"]})
+    for name in names:
+        samples = [r["operations"][name] for r in runs if name in r["operations"]]
+        operation = {"requests": sum(s["requests"] for s in samples)}
+        for key in PERCENTILE_COLUMNS:
+            operation[key] = summarize([s[key] for s in samples])
+        result["operations"][name] = operation
+    return result
+
+
+def is_regression(metric, baseline, current, tolerance, sigma):
+    """
+    Decide whether the mean of ``current`` is significantly worse than ``baseline``.
+    A change only counts when it exceeds both ``tolerance`` relative to the baseline
+    and ``sigma`` standard errors of the difference of the two means. Summaries of
+    fewer than two runs carry no variance estimate and are never gated.
+    """
+    if not baseline or not current or baseline["n"] < 2 or current["n"] < 2:
+        return False
+    standard_error = math.hypot(baseline["stdev"] / math.sqrt(baseline["n"]),
+                                current["stdev"] / math.sqrt(current["n"]))
+    allowed = max(tolerance * abs(baseline["mean"]), sigma * standard_error)
+
+    delta = current["mean"] - baseline["mean"]
+    if METRIC_DIRECTIONS[metric] == "lower":
+        delta = -delta
+    return delta > allowed
+
+
+def is_failure_regression(baseline, current, sigma, max_failure_increase):
+    """
+    Two-proportion test on the total request/failure counts of both results.
+    The failure ratio counts as regressed when it rose by more than
+    ``max_failure_increase`` (absolute) and by more than ``sigma`` standard errors.
+    """
+    base_requests, cur_requests = baseline.get("requests"), current.get("requests")
+    if not base_requests or not cur_requests:
+        return False
+    base_ratio = baseline["failures"] / base_requests
+    cur_ratio = current["failures"] / cur_requests
+    pooled = (baseline["failures"] + current["failures"]) / (base_requests + cur_requests)
+    standard_error = math.sqrt(pooled * (1 - pooled) * (1 / base_requests + 1 / cur_requests))
+    return cur_ratio - base_ratio > max(max_failure_increase, sigma * standard_error)
+
+
+def compare_results(baseline, current, tolerance=0.15, sigma=3.0, min_requests=20, max_failure_increase=0.01):
+    """
+    Compare a result against a baseline.
+    :return: list of human-readable regression descriptions (empty when clean)
+    """
+    regressions = []
+
+    def check(label, metric, base, cur):
+        if is_regression(metric, base, cur, tolerance, sigma):
+            regressions.append(f"{label} {metric}: {base['mean']} -> {cur['mean']}")
+
+    for metric in ("rps", "cpu_percent"):
+        check("total", metric, baseline.get(metric), current.get(metric))
+
+    if is_failure_regression(baseline, current, sigma, max_failure_increase):
+        regressions.append(f"total failure_ratio: {baseline['failures']}/{baseline['requests']} "
+                           f"-> {current['failures']}/{current['requests']}")
+
+    for name, base_op in baseline.get("operations", {}).items():
+        # Percentiles from a handful of requests are noise, not signal, and a rarely
+        # hit operation may simply not come up in the next run
+        if base_op["requests"] < min_requests:
+            continue
+        cur_op = current["operations"].get(name)
+        if cur_op is None:
+            regressions.append(f"{name}: missing from current run")
+            continue
+        if cur_op["requests"] < min_requests:
+            continue
+        for metric in PERCENTILE_COLUMNS:
+            check(name, metric, base_op.get(metric), cur_op.get(metric))
+
+    return regressions
+
+
+def run_benchmark(profile_name, repeat=1, port=5000):
+    """Start the mock backend, run a profile ``repeat`` times and return the result document."""
+    profile = BENCHMARK_PROFILES[profile_name]
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="locust_bench_") as workdir, \
+            open(os.path.join(workdir, "output.log"), "w") as log_file:
+        backend = start_mock_backend(port, log_file)
+        try:
+            for i in range(repeat):
+                print(f"[benchmark] {profile_name}: run {i + 1}/{repeat} ({profile['run_time']}s)")
+                runs.append(run_profile_once(profile, f"http://127.0.0.1:{port}", workdir, f"run{i}", log_file))
+        finally:
+            stop_mock_backend(backend)
+    return build_result(profile_name, profile, runs)
+
+
+def baseline_mismatches(baseline, profile_name, profile, repeat):
+    """
+    Reasons why a baseline is not comparable with a run of ``profile``.
+    Per-operation request counts are summed over runs, so the run count must match too.
+    :return: list of mismatch descriptions (empty when comparable)
+    """
+    mismatches = []
+    if baseline.get("profile") != profile_name:
+        mismatches.append(f"profile '{baseline.get('profile')}' != '{profile_name}'")
+    # Round-trip through JSON so tuples/lists compare the way they were stored
+    if baseline.get("settings") != json.loads(json.dumps(profile)):
+        mismatches.append(f"settings {baseline.get('settings')} != {profile}")
+    if baseline.get("runs") != repeat:
+        mismatches.append(f"runs {baseline.get('runs')} != {repeat}")
+    if "requests" not in baseline or "failures" not in baseline:
+        mismatches.append("no total request/failure counts, re-record the baseline")
+    return mismatches
+
+
+def save_result(result, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, separators=(",", ":"))
+    print(f"[benchmark] Result written to {path}")
+
+
+def load_result(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless locust benchmark against the local mock backend")
+    parser.add_argument("profile", choices=sorted(BENCHMARK_PROFILES), help="Benchmark profile to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs to aggregate (default: 3)")
+    parser.add_argument("--port", type=int, default=5000, help="Mock backend port (default: 5000)")
+    parser.add_argument("--output", help="Result file (default: results/<profile>-<timestamp>.json)")
+    parser.add_argument("--baseline", help="Baseline result file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the result to --baseline instead")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative change (default: 0.15)")
+    parser.add_argument("--sigma", type=float, default=3.0, help="Allowed standard errors of change (default: 3.0)")
+    parser.add_argument("--max-failure-increase", type=float, default=0.01,
+                        help="Minimum absolute increase of the failure ratio to gate on (default: 0.01, i.e. 1 point)")
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.save_baseline and not args.baseline:
+        parser.error("--save-baseline requires --baseline")
+    if args.baseline and args.repeat < 2:
+        parser.error("--baseline needs --repeat >= 2, a single run has no variance estimate to gate on")
+
+    baseline = None
+    if args.baseline and not args.save_baseline:
+        # Check comparability before spending minutes on the runs
+        try:
+            baseline = load_result(args.baseline)
+        except (OSError, ValueError) as e:
+            print(f"[benchmark] Cannot read baseline {args.baseline}: {e}")
+            return 2
+        mismatches = baseline_mismatches(baseline, args.profile, BENCHMARK_PROFILES[args.profile], args.repeat)
+        if mismatches:
+            print(f"[benchmark] Baseline {args.baseline} is not comparable with this run:")
+            for mismatch in mismatches:
+                print(f"  - {mismatch}")
+            return 2
+
+    result = run_benchmark(args.profile, args.repeat, args.port)
+    print(f"[benchmark] RPS {result['rps']} | failure ratio {result['failure_ratio']} "
+          f"| generator CPU % {result['cpu_percent']}")
+
+    if args.save_baseline:
+        save_result(result, args.baseline)
+        return 0
+
+    output = args.output or os.path.join("results", f"{args.profile}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    save_result(result, output)
+
+    if baseline is None:
+        return 0
+
+    regressions = compare_results(baseline, result, args.tolerance, args.sigma,
+                                  max_failure_increase=args.max_failure_increase)
+    if regressions:
+        print(f"[benchmark] {len(regressions)} regression(s) against {args.baseline}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print(f"[benchmark] No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,3 @@
-import json
 import random
 import time
 from abc import abstractmethod
@@ -7,6 +6,7 @@ from locust import HttpUser, between, task
 
 from utils.config import get_tenant_config
 from utils.graphql_loader import load_query
+from utils.sharding import load_user_pool
 
 
 class MultiTenantUser(HttpUser):
@@ -34,31 +34,11 @@ class MultiTenantUser(HttpUser):
         self.get_user_info_and_extract_outlets()
 
     def load_and_login(self):
-        """Load user credentials from a JSON file and perform login."""
-        if isinstance(self.config, dict):
-            user_pool_file = self.config.get('user_pool')
-            if not user_pool_file:
-                user_pool_file = f"{self.tenant_id}_users.json"
-        else:
-            raise TypeError("self.config is not a dictionary")
-
-        user_pools = [
-            f"data/{user_pool_file}",
-            "data/users.json"  # Fallback
-        ]
-
-        for users_file in user_pools:
-            try:
-                with open(users_file, "r") as f:
-                    users = json.load(f)
-                    user = random.choice(users)
-                    self.login(user["username"], user["password"])
-                    print(f"[{self.tenant_id}] Loaded user from {users_file}")
-                    return
-            except FileNotFoundError:
-                continue
-
-        raise FileNotFoundError(f"No user pool found for tenant {self.tenant_id}")
+        """Pick a user from this worker's slice of the tenant pool and perform login."""
+        users_file, users = load_user_pool(self.tenant_id)
+        user = random.choice(users)
+        self.login(user["username"], user["password"])
+        print(f"[{self.tenant_id}] Loaded user from {users_file}")
 
     def login(self, username, password, tenant="slumberland"):
         config = get_tenant_config(tenant)
@@ -75,7 +55,7 @@ class MultiTenantUser(HttpUser):
             "query": query
         }
         with self.client.post("/", json=test_login_payload, headers={"Content-Type": "application/json"},
-                              catch_response=True) as response:
+                              name=f"{self.tenant_id} | GraphQL: Login", catch_response=True) as response:
             if response.status_code == 200:
                 data = response.json()
                 try:
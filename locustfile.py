@@ -1,14 +1,24 @@
 from tenants.neverwinter_user import NeverwinterUser
 from tenants.slumberland_user import SlumberLandUser
+from utils.config import STRATEGIES
+from utils.sharding import current_tenant_shard
 
 
 # Main orchestration user class for login-only users
 
 class SlumberlandStrategy(SlumberLandUser):
     """Slumberland Strategy A"""
-    weight = 1
+    weight = STRATEGIES["SlumberlandStrategy"]["weight"]
 
 
 class NeverwinterStrategy(NeverwinterUser):
     """Neverwinter Strategy B"""
-    weight = 2
+    weight = STRATEGIES["NeverwinterStrategy"]["weight"]
+
+
+# Processes pinned to a tenant shard (see utils/sharding.py) only run that shard's strategies
+tenant_shard = current_tenant_shard(strategy["tenant"] for strategy in STRATEGIES.values())
+if tenant_shard is not None:
+    for strategy_class in (SlumberlandStrategy, NeverwinterStrategy):
+        if STRATEGIES[strategy_class.__name__]["tenant"] not in tenant_shard:
+            strategy_class.abstract = True
@@ -0,0 +1,174 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from benchmark import parse_stats_csv, run_locust, start_mock_backend, stop_mock_backend
+from utils.config import STRATEGIES
+from utils.sharding import POOL_SHARD_ENV, TENANT_SHARD_ENV, plan_shards, read_user_pool, shard_env
+
+TENANT_WEIGHTS = {strategy["tenant"]: strategy["weight"] for strategy in STRATEGIES.values()}
+TENANT_STRATEGIES = {strategy["tenant"]: name for name, strategy in STRATEGIES.items()}
+
+
+def check_pool_partitions(shards):
+    """
+    Check that every worker gets a non-empty slice of each pool it uses, and that
+    no username appears twice in a pool file: slices never overlap, so a duplicate
+    entry is the only way one credential could reach two workers.
+    :return: list of problems (empty when the sharding is valid)
+    """
+    problems = []
+    owners = {}
+    for shard in shards:
+        for pool_file, (index, count) in shard["pools"].items():
+            users = read_user_pool(pool_file, index, count)
+            if not users:
+                problems.append(f"worker {shard['index']}: empty slice {index + 1} of {count} of {pool_file}")
+            for user in users:
+                owner = owners.setdefault((pool_file, user["username"]), shard["index"])
+                if owner != shard["index"]:
+                    problems.append(f"duplicate username {user['username']} in {pool_file} "
+                                    f"used by workers {owner} and {shard['index']}")
+    return problems
+
+
+def check_observed_tenants(shard, stats):
+    """Every operation a worker reported must belong to one of its pinned tenants."""
+    problems = []
+    for name in stats["operations"]:
+        tenant = name.split(" | ", 1)[0]
+        if tenant not in shard["tenants"]:
+            problems.append(f"worker {shard['index']} ran {name} outside its shard {sorted(shard['tenants'])}")
+    return problems
+
+
+def plan_workers(worker_count, total_users):
+    """
+    Plan the shards for ``worker_count`` workers and validate them.
+    :return: (shards, problems), shards is None when planning failed
+    """
+    try:
+        shards = plan_shards(TENANT_WEIGHTS, worker_count, total_users)
+    except (ValueError, FileNotFoundError) as e:
+        return None, [str(e)]
+    problems = check_pool_partitions(shards)
+    if len(shards) < worker_count:
+        # A worker without users would run "-u 0" and skew the efficiency numbers
+        problems.append(f"only {len(shards)} of {worker_count} workers get users, raise the user count")
+    return shards, problems
+
+
+def shard_user_classes(shard):
+    return [TENANT_STRATEGIES[tenant] for tenant in shard["tenants"]]
+
+
+def print_plan(worker_count, total_users, spawn_rate, run_time):
+    """Print the environment and locust command line for each shard without starting anything."""
+    shards, problems = plan_workers(worker_count, total_users)
+    for problem in problems:
+        print(f"[scaling] SHARDING ERROR: {problem}")
+    if problems:
+        return 1
+
+    for shard in shards:
+        env = shard_env(shard, {})
+        users = sum(shard["tenants"].values())
+        print(f"# worker {shard['index']}: {shard['tenants']}")
+        print(f"{TENANT_SHARD_ENV}={env[TENANT_SHARD_ENV]} {POOL_SHARD_ENV}={env[POOL_SHARD_ENV]} "
+              f"locust -f locustfile.py --headless -u {users} -r {spawn_rate} -t {run_time}s --host <HOST> "
+              f"{' '.join(shard_user_classes(shard))}")
+    return 0
+
+
+def run_workers(worker_count, total_users, spawn_rate, run_time, host, workdir, log_file):
+    """
+    Run one sharded locust process per worker concurrently and collect their stats.
+    :return: (shards, per-shard stats, problems)
+    """
+    shards, problems = plan_workers(worker_count, total_users)
+    if problems:
+        return shards, None, problems
+
+    processes = []
+    for shard in shards:
+        profile = {
+            "spawn_rate": spawn_rate,
+            "run_time": run_time,
+            "user_classes": shard_user_classes(shard),
+        }
+        label = f"w{worker_count}_shard{shard['index']}"
+        users = sum(shard["tenants"].values())
+        env = shard_env(shard)
+        processes.append(run_locust(profile, host, workdir, label, users=users, env=env, log_file=log_file))
+
+    results = []
+    for shard, (process, stats_file) in zip(shards, processes):
+        process.wait()
+        if not os.path.exists(stats_file):
+            problems.append(f"worker {shard['index']} produced no stats (exit code {process.returncode})")
+            continue
+        stats = parse_stats_csv(stats_file)
+        problems.extend(check_observed_tenants(shard, stats))
+        results.append(stats)
+    return shards, results, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local multi-process scaling run with tenant sharded workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2], help="Worker counts to run (default: 1 2)")
+    parser.add_argument("--users-per-worker", type=int, default=10,
+                        help="Average users per worker (default: 10); each step spawns this times the worker "
+                             "count in total, split across shards by tenant weight")
+    parser.add_argument("--spawn-rate", type=float, default=5, help="Spawn rate per worker (default: 5)")
+    parser.add_argument("--run-time", type=int, default=60, help="Seconds per step (default: 60)")
+    parser.add_argument("--port", type=int, default=5000, help="Mock backend port (default: 5000)")
+    parser.add_argument("--plan", type=int, metavar="WORKERS",
+                        help="Only print the shard environment and locust command per worker, start nothing")
+    parser.add_argument("--users", type=int, help="Total users to plan for, required with --plan")
+    args = parser.parse_args(argv)
+
+    if args.plan is not None:
+        if args.users is None:
+            parser.error("--plan requires --users")
+        return print_plan(args.plan, args.users, args.spawn_rate, args.run_time)
+
+    host = f"http://127.0.0.1:{args.port}"
+    rows = []
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="locust_scaling_") as workdir, \
+            open(os.path.join(workdir, "output.log"), "w") as log_file:
+        backend = start_mock_backend(args.port, log_file)
+        try:
+            for worker_count in args.workers:
+                total_users = args.users_per_worker * worker_count
+                print(f"[scaling] {worker_count} worker(s), {total_users} users, {args.run_time}s")
+                shards, results, problems = run_workers(worker_count, total_users, args.spawn_rate,
+                                                        args.run_time, host, workdir, log_file)
+                for problem in problems:
+                    print(f"[scaling] SHARDING ERROR: {problem}")
+                if problems:
+                    failed = True
+                    continue
+                for shard, stats in zip(shards, results):
+                    print(f"[scaling]   worker {shard['index']}: {shard['tenants']} "
+                          f"-> {stats['aggregated']['rps']:.2f} rps")
+                rows.append((worker_count, sum(r["aggregated"]["rps"] for r in results)))
+        finally:
+            stop_mock_backend(backend)
+
+    if rows:
+        # Speedup is relative to the smallest step that succeeded, whatever order the steps ran in
+        rows.sort()
+        base_workers, base_rps = rows[0]
+        print(f"{'workers':>8} {'total rps':>10} {'speedup':>8} {'efficiency':>11}")
+        for worker_count, rps in rows:
+            speedup = rps / base_rps if base_rps else 0.0
+            efficiency = speedup * base_workers / worker_count
+            print(f"{worker_count:>8} {rps:>10.2f} {speedup:>8.2f} {efficiency:>10.0%}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import copy
+import json
+import os
+
+import pytest
+
+from benchmark import (BENCHMARK_PROFILES, baseline_mismatches, build_result, compare_results, main,
+                       parse_stats_csv)
+
+STATS_CSV = os.path.join(os.path.dirname(__file__), "fixtures", "locust_stats.csv")
+SEARCH = "neverwinter | rapid_product_browsing | GraphQL: SearchResultItem"
+
+
+def summary(mean, stdev=1.0, n=3):
+    return {"mean": mean, "stdev": stdev, "n": n}
+
+
+def make_result(rps=10.0, requests=3000, failures=300, p95=100.0, op_requests=500):
+    return {
+        "profile": "smoke",
+        "settings": BENCHMARK_PROFILES["smoke"],
+        "runs": 3,
+        "requests": requests,
+        "failures": failures,
+        "rps": summary(rps, stdev=0.2),
+        "failure_ratio": summary(failures / requests, stdev=0.01),
+        "cpu_percent": summary(20.0),
+        "operations": {
+            SEARCH: {"requests": op_requests, "p50": summary(50.0), "p95": summary(p95), "p99": summary(200.0)},
+        },
+    }
+
+
+def test_parse_stats_csv():
+    stats = parse_stats_csv(STATS_CSV)
+
+    assert stats["aggregated"] == {"requests": 123, "failures": 13, "rps": 4.1, "p50": 80.0, "p95": 150.0,
+                                   "p99": 450.0}
+    assert stats["operations"][SEARCH]["p95"] == 140.0
+    assert stats["operations"]["slumberland | cart_and_notifications_flow | GraphQL: Cart"]["p50"] is None
+    assert "Aggregated" not in stats["operations"]
+
+
+def test_build_result_aggregates_runs():
+    runs = [dict(parse_stats_csv(STATS_CSV), cpu_percent=cpu) for cpu in (10.0, 20.0)]
+    result = build_result("smoke", BENCHMARK_PROFILES["smoke"], runs)
+
+    assert result["runs"] == 2
+    assert (result["requests"], result["failures"]) == (246, 26)
+    assert result["rps"] == {"mean": 4.1, "stdev": 0.0, "n": 2}
+    assert result["cpu_percent"]["mean"] == 15.0
+    assert result["operations"][SEARCH]["requests"] == 240
+    assert result["operations"]["slumberland | cart_and_notifications_flow | GraphQL: Cart"]["p95"] is None
+
+
+def test_identical_results_do_not_regress():
+    assert compare_results(make_result(), make_result()) == []
+
+
+def test_lower_rps_is_a_regression_but_higher_is_not():
+    assert compare_results(make_result(rps=10.0), make_result(rps=7.0)) == ["total rps: 10.0 -> 7.0"]
+    assert compare_results(make_result(rps=10.0), make_result(rps=13.0)) == []
+
+
+def test_higher_percentile_is_a_regression_but_lower_is_not():
+    assert compare_results(make_result(p95=100.0), make_result(p95=150.0)) == [f"{SEARCH} p95: 100.0 -> 150.0"]
+    assert compare_results(make_result(p95=100.0), make_result(p95=60.0)) == []
+
+
+def test_change_within_standard_error_is_not_a_regression():
+    baseline, current = make_result(rps=10.0), make_result(rps=7.0)
+    baseline["rps"]["stdev"] = current["rps"]["stdev"] = 3.0
+
+    assert compare_results(baseline, current) == []
+
+
+def test_single_run_summaries_are_not_gated():
+    baseline, current = make_result(rps=10.0), make_result(rps=5.0)
+    baseline["rps"]["n"] = current["rps"]["n"] = 1
+
+    assert compare_results(baseline, current) == []
+
+
+def test_rarely_hit_operations_are_skipped():
+    baseline = make_result(p95=100.0, op_requests=5)
+    assert compare_results(baseline, make_result(p95=500.0, op_requests=5)) == []
+
+    current = make_result()
+    current["operations"] = {}
+    assert compare_results(baseline, current) == []
+
+
+def test_missing_operation_with_enough_samples_is_a_regression():
+    current = make_result()
+    current["operations"] = {}
+
+    assert compare_results(make_result(), current) == [f"{SEARCH}: missing from current run"]
+
+
+def test_failure_ratio_increase_beyond_noise_is_a_regression():
+    regressions = compare_results(make_result(failures=300), make_result(failures=450))
+
+    assert regressions == ["total failure_ratio: 300/3000 -> 450/3000"]
+
+
+def test_failure_ratio_noise_is_not_a_regression():
+    # 10% -> 11.3% on 3000 requests is within three standard errors
+    assert compare_results(make_result(failures=300), make_result(failures=340)) == []
+
+
+def test_failure_ratio_below_minimum_increase_is_not_a_regression():
+    baseline, current = make_result(requests=10 ** 6, failures=0), make_result(requests=10 ** 6, failures=5000)
+
+    assert compare_results(baseline, current) == []
+    assert compare_results(baseline, current, max_failure_increase=0.001) != []
+
+
+def test_baseline_mismatches():
+    baseline = json.loads(json.dumps(make_result()))
+    profile = BENCHMARK_PROFILES["smoke"]
+
+    assert baseline_mismatches(baseline, "smoke", profile, 3) == []
+    assert len(baseline_mismatches(baseline, "baseline", profile, 3)) == 1
+    assert len(baseline_mismatches(baseline, "smoke", dict(profile, users=99), 3)) == 1
+    assert baseline_mismatches(baseline, "smoke", profile, 2) == ["runs 3 != 2"]
+
+    del baseline["requests"]
+    assert len(baseline_mismatches(baseline, "smoke", profile, 3)) == 1
+
+
+@pytest.mark.parametrize("argv", [
+    ["smoke", "--repeat", "0"],
+    ["smoke", "--repeat", "1", "--baseline", "baseline.json"],
+])
+def test_main_rejects_invalid_repeat(argv):
+    with pytest.raises(SystemExit) as exc:
+        main(argv)
+    assert exc.value.code == 2
+
+
+def test_main_reports_unreadable_baseline(tmp_path, capsys):
+    assert main(["smoke", "--baseline", str(tmp_path / "missing.json")]) == 2
+    assert "Cannot read baseline" in capsys.readouterr().out
+
+
+def test_main_refuses_incomparable_baseline(tmp_path):
+    baseline = copy.deepcopy(make_result())
+    baseline["settings"] = dict(baseline["settings"], users=99)
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps(baseline))
+
+    assert main(["smoke", "--baseline", str(path)]) == 2
@@ -0,0 +1,145 @@
+import json
+
+import pytest
+
+from utils.sharding import (POOL_SHARD_ENV, TENANT_SHARD_ENV, apportion, current_pool_shard, current_tenant_shard,
+                            partition_pool, plan_shards, read_user_pool, shard_env, without_shard_env)
+
+WEIGHTS = {"slumberland": 1, "neverwinter": 2}
+
+
+@pytest.fixture
+def pools(tmp_path, monkeypatch):
+    """Run in a scratch directory with a shared fallback pool and a neverwinter pool."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+
+    def write_pool(name, size):
+        users = [{"username": f"{name}{i}", "password": "secret"} for i in range(size)]
+        (tmp_path / "data" / f"{name}.json").write_text(json.dumps(users))
+
+    write_pool("users", 10)
+    write_pool("neverwinter_users", 7)
+    return write_pool
+
+
+def test_apportion_sums_to_total_and_follows_weights():
+    assert apportion(10, WEIGHTS) == {"slumberland": 3, "neverwinter": 7}
+    assert apportion(7, {"a": 1, "b": 1, "c": 1}) == {"a": 3, "b": 2, "c": 2}
+    assert sum(apportion(101, {"a": 3, "b": 5, "c": 11}).values()) == 101
+
+
+def test_apportion_rejects_zero_weights():
+    with pytest.raises(ValueError):
+        apportion(10, {"a": 0})
+
+
+def test_plan_shards_drops_zero_user_tenants(pools):
+    shards = plan_shards(WEIGHTS, 4, 1)
+
+    assert shards == [{"index": 0, "tenants": {"neverwinter": 1}, "pools": {"data/neverwinter_users.json": (0, 1)}}]
+
+
+def test_plan_shards_never_gives_a_tenant_more_workers_than_users(pools):
+    for worker_count in range(1, 8):
+        for total_users in range(1, 12):
+            shards = plan_shards(WEIGHTS, worker_count, total_users)
+
+            assert len(shards) <= worker_count
+            assert sum(sum(shard["tenants"].values()) for shard in shards) == total_users
+            assert all(users > 0 for shard in shards for users in shard["tenants"].values())
+
+
+def test_plan_shards_pins_tenants_when_there_are_enough_workers(pools):
+    shards = plan_shards(WEIGHTS, 4, 40)
+
+    assert [shard["tenants"] for shard in shards] == [
+        {"slumberland": 7}, {"slumberland": 6}, {"neverwinter": 14}, {"neverwinter": 13},
+    ]
+
+
+def test_plan_shards_packs_tenants_onto_fewer_workers(pools):
+    shards = plan_shards(WEIGHTS, 1, 10)
+
+    assert shards[0]["tenants"] == {"neverwinter": 7, "slumberland": 3}
+
+
+def test_pool_slices_are_split_among_the_shards_using_each_pool(pools):
+    shards = plan_shards(WEIGHTS, 4, 40)
+
+    assert [shard["pools"] for shard in shards] == [
+        {"data/users.json": (0, 2)},
+        {"data/users.json": (1, 2)},
+        {"data/neverwinter_users.json": (0, 2)},
+        {"data/neverwinter_users.json": (1, 2)},
+    ]
+
+
+def test_pool_slices_are_disjoint_and_cover_the_pool(pools):
+    shards = plan_shards(WEIGHTS, 5, 50)
+    seen = {}
+    for shard in shards:
+        for pool_file, (index, count) in shard["pools"].items():
+            seen.setdefault(pool_file, []).extend(u["username"] for u in read_user_pool(pool_file, index, count))
+
+    for pool_file, usernames in seen.items():
+        with open(pool_file) as f:
+            expected = [u["username"] for u in json.load(f)]
+        assert sorted(usernames) == sorted(expected)
+        assert len(set(usernames)) == len(usernames)
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 11])
+def test_partition_pool_is_disjoint_and_complete(count):
+    users = list(range(10))
+    slices = [partition_pool(users, index, count) for index in range(count)]
+
+    assert sorted(u for s in slices for u in s) == users
+
+
+def test_shard_env_round_trips_through_current_pool_shard(pools, monkeypatch):
+    shard = plan_shards(WEIGHTS, 4, 40)[3]
+    env = shard_env(shard, {})
+    monkeypatch.setenv(POOL_SHARD_ENV, env[POOL_SHARD_ENV])
+
+    assert env[TENANT_SHARD_ENV] == "neverwinter"
+    assert current_pool_shard("data/neverwinter_users.json") == (1, 2)
+
+
+def test_current_pool_shard_defaults_to_whole_pool(monkeypatch):
+    monkeypatch.delenv(POOL_SHARD_ENV, raising=False)
+
+    assert current_pool_shard("data/users.json") == (0, 1)
+
+
+@pytest.mark.parametrize("value, message", [
+    ("2", "expected <pool file>:<index>/<count>"),
+    ("data/users.json:a/b", "expected <pool file>:<index>/<count>"),
+    ("data/users.json:1", "expected <pool file>:<index>/<count>"),
+    ("data/users.json:0/0", "count must be at least 1"),
+    ("data/users.json:2/2", "index must be in 0..1"),
+    ("data/other.json:0/1", "has no slice for data/users.json"),
+])
+def test_current_pool_shard_rejects_malformed_values(monkeypatch, value, message):
+    monkeypatch.setenv(POOL_SHARD_ENV, value)
+
+    with pytest.raises(ValueError, match=message):
+        current_pool_shard("data/users.json")
+
+
+def test_current_tenant_shard(monkeypatch):
+    monkeypatch.delenv(TENANT_SHARD_ENV, raising=False)
+    assert current_tenant_shard(WEIGHTS) is None
+
+    monkeypatch.setenv(TENANT_SHARD_ENV, "neverwinter, slumberland")
+    assert current_tenant_shard(WEIGHTS) == {"neverwinter", "slumberland"}
+
+    monkeypatch.setenv(TENANT_SHARD_ENV, "neverwintr")
+    with pytest.raises(ValueError, match="unknown tenant"):
+        current_tenant_shard(iter(WEIGHTS))
+
+
+def test_without_shard_env_strips_shard_variables():
+    env = without_shard_env({TENANT_SHARD_ENV: "slumberland", POOL_SHARD_ENV: "data/users.json:0/1", "PATH": "/bin"})
+
+    assert env == {"PATH": "/bin"}
@@ -51,6 +51,14 @@ TENANT_CONFIGS = {
     },
 }
 
+# locustfile.py strategy class -> tenant it simulates and its locust weight.
+# Kept here so tools that plan shards do not have to import locust.
+STRATEGIES = {
+    "SlumberlandStrategy": {"tenant": "slumberland", "weight": 1},
+    "NeverwinterStrategy": {"tenant": "neverwinter", "weight": 2},
+}
+
+
 
 def get_tenant_config(tenant_name: object = "slumberland") -> object:
     base = copy.deepcopy(TENANT_CONFIGS[tenant_name])
@@ -1,3 +1,7 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
 def load_query(filename: str) -> str:
     """
     Load a GraphQL query from a file.
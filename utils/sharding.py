@@ -0,0 +1,191 @@
+import json
+import os
+
+from utils.config import get_tenant_config
+
+# Environment variables a load generator process reads to find its shard
+TENANT_SHARD_ENV = "TENANT_SHARD"  # comma separated tenant ids, e.g. "slumberland,neverwinter"
+POOL_SHARD_ENV = "POOL_SHARD"  # "<pool file>:<index>/<count>" per pool, e.g. "data/users.json:0/2"
+
+_USER_POOL_CACHE = {}
+
+
+def apportion(total, weights):
+    """
+    Split ``total`` into integer parts proportional to ``weights`` (largest remainder method).
+    :param total: amount to split
+    :param weights: dict of key -> weight
+    :return: dict of key -> share, shares sum up to ``total``
+    """
+    weight_sum = sum(weights.values())
+    if weight_sum <= 0:
+        raise ValueError("Weights must sum up to a positive number")
+
+    exact = {key: total * weight / weight_sum for key, weight in weights.items()}
+    shares = {key: int(value) for key, value in exact.items()}
+    leftover = total - sum(shares.values())
+    for key in sorted(exact, key=lambda k: exact[k] - shares[k], reverse=True)[:leftover]:
+        shares[key] += 1
+    return shares
+
+
+def plan_shards(tenant_weights, worker_count, total_users):
+    """
+    Pin tenants to workers and spread users proportionally to tenant weights.
+    Tenants whose share rounds down to zero users are left out. With more workers
+    than tenants each tenant gets at least one worker and the rest are handed out
+    by weight, but never more workers than the tenant has users; with fewer, tenants
+    are packed onto the least loaded worker, heaviest first. Each shard also gets
+    its slice of every user pool it uses, see ``plan_pool_slices``.
+    :return: list of non-empty shards, at most ``worker_count`` of them:
+        {"index", "tenants": {tenant: users}, "pools": {pool_file: (index, count)}}
+    """
+    if worker_count < 1:
+        raise ValueError("worker_count must be at least 1")
+
+    tenant_users = {tenant: users for tenant, users in apportion(total_users, tenant_weights).items() if users}
+    if not tenant_users:
+        raise ValueError(f"{total_users} users are not enough for any tenant")
+    weights = {tenant: tenant_weights[tenant] for tenant in tenant_users}
+    shards = []
+
+    if worker_count >= len(weights):
+        extra = apportion(worker_count - len(weights), weights)
+        for tenant in weights:
+            workers = min(extra[tenant] + 1, tenant_users[tenant])
+            per_worker = apportion(tenant_users[tenant], {i: 1 for i in range(workers)})
+            for i in range(workers):
+                shards.append({"index": len(shards), "tenants": {tenant: per_worker[i]}})
+    else:
+        shards = [{"index": i, "tenants": {}} for i in range(worker_count)]
+        load = [0] * worker_count
+        for tenant in sorted(weights, key=weights.get, reverse=True):
+            target = load.index(min(load))
+            shards[target]["tenants"][tenant] = tenant_users[tenant]
+            load[target] += weights[tenant]
+
+    plan_pool_slices(shards)
+    return shards
+
+
+def plan_pool_slices(shards):
+    """
+    Split each user pool file among the shards that use it, so a tenant with its
+    own pool uses all of it and a shared fallback pool is never handed out twice.
+    Stores {pool_file: (index, count)} under ``shard["pools"]``.
+    """
+    users_of_pool = {}
+    for shard in shards:
+        for tenant in shard["tenants"]:
+            shard_indexes = users_of_pool.setdefault(resolve_user_pool(tenant), [])
+            if shard["index"] not in shard_indexes:
+                shard_indexes.append(shard["index"])
+
+    for shard in shards:
+        shard["pools"] = {
+            pool_file: (shard_indexes.index(shard["index"]), len(shard_indexes))
+            for pool_file, shard_indexes in users_of_pool.items()
+            if shard["index"] in shard_indexes
+        }
+
+
+def without_shard_env(base_env=None):
+    """Copy of the environment with the shard variables removed, for unsharded locust runs."""
+    env = dict(base_env if base_env is not None else os.environ)
+    env.pop(TENANT_SHARD_ENV, None)
+    env.pop(POOL_SHARD_ENV, None)
+    return env
+
+
+def shard_env(shard, base_env=None):
+    """Environment for the load generator process that runs ``shard``."""
+    env = dict(base_env if base_env is not None else os.environ)
+    env[TENANT_SHARD_ENV] = ",".join(shard["tenants"])
+    env[POOL_SHARD_ENV] = ",".join(
+        f"{pool_file}:{index}/{count}" for pool_file, (index, count) in shard["pools"].items()
+    )
+    return env
+
+
+def current_tenant_shard(known_tenants):
+    """
+    Tenants this process is pinned to, or None when it runs all of them.
+    :param known_tenants: tenants that have a strategy, anything else is a typo
+    """
+    value = os.environ.get(TENANT_SHARD_ENV, "").strip()
+    if not value:
+        return None
+    known_tenants = set(known_tenants)
+    tenants = {tenant.strip() for tenant in value.split(",") if tenant.strip()}
+    unknown = tenants - known_tenants
+    if unknown:
+        raise ValueError(f"{TENANT_SHARD_ENV}={value} names unknown tenant(s) {sorted(unknown)}, "
+                         f"expected some of {sorted(known_tenants)}")
+    return tenants
+
+
+def current_pool_shard(pool_file):
+    """(index, count) of this process among the workers sharing ``pool_file``, (0, 1) when not sharded."""
+    value = os.environ.get(POOL_SHARD_ENV, "").strip()
+    if not value:
+        return 0, 1
+
+    for entry in value.split(","):
+        try:
+            path, position = entry.strip().rsplit(":", 1)
+            index, count = (int(part) for part in position.split("/"))
+        except ValueError:
+            raise ValueError(f"Invalid {POOL_SHARD_ENV} entry '{entry}', "
+                             f"expected <pool file>:<index>/<count>") from None
+        if count < 1:
+            raise ValueError(f"Invalid {POOL_SHARD_ENV} entry '{entry}', count must be at least 1")
+        if not 0 <= index < count:
+            raise ValueError(f"Invalid {POOL_SHARD_ENV} entry '{entry}', index must be in 0..{count - 1}")
+        if path == pool_file:
+            return index, count
+
+    raise ValueError(f"{POOL_SHARD_ENV}={value} has no slice for {pool_file}")
+
+
+def partition_pool(users, index, count):
+    """Slice of ``users`` owned by worker ``index`` of ``count``; slices never overlap."""
+    return users[index::count]
+
+
+def user_pool_paths(tenant_id):
+    """Candidate user pool files for a tenant, tenant specific first."""
+    config = get_tenant_config(tenant_id)
+    user_pool_file = config.get("user_pool") or f"{tenant_id}_users.json"
+    return [
+        f"data/{user_pool_file}",
+        "data/users.json"  # Fallback
+    ]
+
+
+def resolve_user_pool(tenant_id):
+    """First existing user pool file for a tenant."""
+    for users_file in user_pool_paths(tenant_id):
+        if os.path.exists(users_file):
+            return users_file
+    raise FileNotFoundError(f"No user pool found for tenant {tenant_id}")
+
+
+def read_user_pool(users_file, index, count):
+    """Read a pool file and keep slice ``index`` of ``count``."""
+    with open(users_file, "r") as f:
+        return partition_pool(json.load(f), index, count)
+
+
+def load_user_pool(tenant_id):
+    """
+    Load the user pool for a tenant once per process, keeping only this worker's slice.
+    :return: (path, users)
+    """
+    if tenant_id not in _USER_POOL_CACHE:
+        users_file = resolve_user_pool(tenant_id)
+        index, count = current_pool_shard(users_file)
+        users = read_user_pool(users_file, index, count)
+        if not users:
+            raise ValueError(f"User pool {users_file} has no users for slice {index + 1} of {count}")
+        _USER_POOL_CACHE[tenant_id] = (users_file, users)
+    return _USER_POOL_CACHE[tenant_id]